@@ -7,23 +7,57 @@ both text and embedded images. It leverages an external Vision AI model to gener
 descriptive text for visuals, creating a more accessible and informative output for LLMs.
 """
 # LLM required Libraries
-from llama_cpp import Llama
+from llama_cpp import Llama, LlamaRAMCache
 from llama_cpp.llama_chat_format import Llava15ChatHandler
-import urllib.parse
+import base64
+
+# Optional: NVIDIA GPU memory probe used to pick how many layers to offload
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+# Optional: faster hashing and perceptual hashing to skip duplicate images
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    import imagehash
+except ImportError:
+    imagehash = None
+
+# Optional: Aho-Corasick automaton to replace many image placeholders at once
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Libraries to Saving Image form PDF file
 from PIL import Image
 import io
+import hashlib
 
 # PDF reading library
 import pymupdf 
 
 # Basic Libraries
 import os
+import re
+import atexit
+import weakref
+import functools
+import collections
+import concurrent.futures
+import multiprocessing
+import threading
 import sys
 import pathlib
+import math
+import time
 import logging
-from typing import List, Dict
+import logging.handlers
+from typing import Callable, List, Dict, Optional, Tuple
 import argparse
 
 # Variables
@@ -31,6 +65,14 @@ pdf_path = ""                    # Path to the pdf you want to process
 model_path = ""                  # Path to the vision Model
 clip_model_path = ""             # Path to the clip model
 temp_images_dir = "images_tmp"
+module_dir = pathlib.Path(__file__).resolve().parent  # Temporary images and outputs are saved here
+min_pages_per_worker = 8         # Don't start a text extraction worker for fewer pages than this
+min_image_pixels = 64 * 64       # Smaller images (icons, bullets) are not sent to the vision model
+max_image_aspect = 20            # Longer/thinner images (rules, underlines) are not sent either
+min_image_entropy = None         # e.g. 1.0 to also skip near-uniform images (decodes every image)
+max_image_side = 1024            # Larger images are downscaled to the vision model's native resolution (Pixtral: 1024)
+image_patch_size = 16            # Pixels per side of the vision model's image patches (one token each; Pixtral: 16)
+prompt_overhead_tokens = 256     # Context kept for the chat template and the per-request text
 
 image_describing_prompt = """
 Goal
@@ -96,97 +138,665 @@ Cross-reference and interconnect all related elements and their relationships
 """
 
 # Configure logging
+# Console messages are buffered and written 100 at a time (or at the first warning),
+# so logging doesn't flush stdout for every image.
+log_format = '%(asctime)s - %(levelname)s - %(message)s'
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(logging.Formatter(log_format))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=log_format,
     handlers=[
         logging.FileHandler("pdf_converter.log"),
-        logging.StreamHandler(sys.stdout)
+        logging.handlers.MemoryHandler(capacity=100, flushLevel=logging.WARNING, target=console_handler)
     ]
 )
 logger = logging.getLogger(__name__)
 
-def get_image_descriptions(
+def _gpu_memory(gpu_index: int = 0) -> Optional[Tuple[int, int]]:
+    """Return the (free, total) memory of an NVIDIA GPU in bytes, or None if it can't be probed."""
+    if pynvml is None:
+        return None
+    try:
+        pynvml.nvmlInit()
+        try:
+            handle = pynvml.nvmlDeviceGetHandleByIndex(gpu_index)
+            info = pynvml.nvmlDeviceGetMemoryInfo(handle)
+            return int(info.free), int(info.total)
+        finally:
+            pynvml.nvmlShutdown()
+    except Exception as e:
+        logger.debug(f"VRAM probe failed: {e}")
+        return None
+
+def _metadata_int(metadata: Dict[str, str], suffix: str) -> Optional[int]:
+    """Read an integer GGUF metadata value by key suffix (the prefix is the architecture)."""
+    for key, value in metadata.items():
+        if key.endswith(suffix):
+            return int(value)
+    return None
+
+def _layer_count(metadata: Dict[str, str]) -> Optional[int]:
+    """Read the number of transformer blocks from GGUF metadata (`<arch>.block_count`)."""
+    return _metadata_int(metadata, ".block_count")
+
+def _kv_bytes_per_token(metadata: Dict[str, str]) -> int:
+    """
+    Estimate the size of the F16 KV cache of one context token from GGUF metadata:
+    keys and values of head_count_kv heads in every block. 0 if the metadata is missing.
+    """
+    layers = _layer_count(metadata)
+    heads = _metadata_int(metadata, ".attention.head_count")
+    kv_heads = _metadata_int(metadata, ".attention.head_count_kv") or heads
+    head_dim = _metadata_int(metadata, ".attention.key_length")
+    if head_dim is None:
+        embedding = _metadata_int(metadata, ".embedding_length")
+        head_dim = embedding // heads if embedding and heads else None
+    if not (layers and kv_heads and head_dim):
+        return 0
+    return 2 * layers * kv_heads * head_dim * 2
+
+def _model_metadata(model_path: str) -> Dict[str, str]:
+    """Read a GGUF model's metadata without loading its weights."""
+    try:
+        return Llama(model_path=model_path, vocab_only=True, verbose=False).metadata
+    except Exception as e:
+        logger.debug(f"Could not read metadata of {model_path}: {e}")
+        return {}
+
+def _probe_gpu_layers(model_path: str, clip_model_path: str, n_ctx: int, main_gpu: int = 0) -> int:
+    """
+    Estimate how many layers of the model fit in the free VRAM of `main_gpu`.
+    The KV cache for `n_ctx` tokens and the CLIP projector are taken off the free
+    memory first, 10% is kept for the compute buffers, and the weights are assumed
+    to be spread evenly over the layers.
+
+    Returns:
+        int: -1 when the whole model fits (or the GPU can't be probed), otherwise
+             the number of layers to offload.
+    """
+    memory = _gpu_memory(main_gpu)
+    if memory is None:
+        logger.info("Could not probe GPU memory, offloading all layers.")
+        return -1
+    metadata = _model_metadata(model_path)
+    layers = _layer_count(metadata)
+    model_size = os.path.getsize(model_path)
+    available = memory[0] * 0.9 - n_ctx * _kv_bytes_per_token(metadata) - os.path.getsize(clip_model_path)
+    if not layers or model_size <= available:
+        return -1
+    per_layer_bytes = model_size / layers
+    return max(0, min(layers, math.floor(available / per_layer_bytes)))
+
+# GGUF `general.file_type` values (llama_ftype) of the common quantizations.
+gguf_file_types = {
+    0: "F32", 1: "F16", 2: "Q4_0", 3: "Q4_1", 7: "Q8_0", 8: "Q5_0", 9: "Q5_1",
+    10: "Q2_K", 11: "Q3_K_S", 12: "Q3_K_M", 13: "Q3_K_L", 14: "Q4_K_S", 15: "Q4_K_M",
+    16: "Q5_K_S", 17: "Q5_K_M", 18: "Q6_K", 32: "BF16",
+}
+# Quantizations too large to be fully offloaded to a consumer GPU for a 12B model.
+full_precision_types = {"F32", "F16", "BF16", "Q8_0"}
+
+def _check_gguf(path: str):
+    """Raise a ValueError if `path` is not a GGUF file."""
+    with open(path, "rb") as f:
+        if f.read(4) != b"GGUF":
+            raise ValueError(f"{path} is not a GGUF file.")
+
+def _check_quantization(metadata: Dict[str, str], model_path: str, quantization: Optional[str], main_gpu: int = 0):
+    """
+    Log the quantization of the loaded model and warn when it is not the expected one,
+    or when a full-precision model is used with less than 24GB of VRAM (the layers
+    that don't fit run on the CPU and become the bottleneck).
+    """
+    file_type = metadata.get("general.file_type")
+    name = gguf_file_types.get(int(file_type), f"type {file_type}") if file_type is not None else "unknown"
+    logger.info(f"{os.path.basename(model_path)} quantization: {name}")
+    if quantization and name.upper() != quantization.upper():
+        logger.warning(f"Expected a {quantization} model but {model_path} is {name}.")
+    memory = _gpu_memory(main_gpu)
+    if name in full_precision_types and memory is not None and memory[1] < 24 * 1024 ** 3:
+        logger.warning(
+            f"{name} model on a GPU with {memory[1] / 1024 ** 3:.0f}GB of VRAM: consider a Q4_K_M or Q5_K_M "
+            f"quantization, e.g. `llama-quantize {model_path} model.Q4_K_M.gguf Q4_K_M`."
+        )
+
+# Models loaded by _get_llm, closed when the interpreter exits.
+_loaded_llms = weakref.WeakSet()
+
+@functools.lru_cache(maxsize=2)
+def _get_llm(
     vision_model_path: str,
     clip_model_path: str,
-    image_paths: List[str],
-    prompt: str = "Describe this image in detail.",
+    n_gpu_layers: Optional[int] = None,
+    n_ctx: int = 4096,
+    tensor_split: Optional[Tuple[float, ...]] = None,
+    main_gpu: int = 0,
+    n_batch: int = 512,
+    n_ubatch: int = 512,
+    flash_attn: bool = False,
+    quantization: Optional[str] = None,
+    prompt_cache_bytes: int = 0
+) -> Llama:
+    """
+    Load the vision model and its CLIP projector once and keep them in memory.
+    Later calls with the same arguments return the same Llama instance, so processing
+    several PDFs only pays the (multi-GB) load cost once.
+    """
+    _check_gguf(vision_model_path)
+    _check_gguf(clip_model_path)
+    if n_gpu_layers is None:
+        n_gpu_layers = _probe_gpu_layers(vision_model_path, clip_model_path, n_ctx, main_gpu)
+    chat_handler = Llava15ChatHandler(clip_model_path=clip_model_path, verbose=False)
+    llm = Llama(
+        model_path=vision_model_path,
+        chat_handler=chat_handler,
+        n_ctx=n_ctx,
+        n_gpu_layers=n_gpu_layers,  # -1 offloads all possible layers to GPU
+        tensor_split=list(tensor_split) if tensor_split else None,
+        main_gpu=main_gpu,
+        n_batch=n_batch,
+        n_ubatch=n_ubatch,
+        flash_attn=flash_attn,
+        n_threads_batch=os.cpu_count(),
+        verbose=False,
+    )
+    total_layers = _layer_count(llm.metadata)
+    if total_layers:
+        offloaded = total_layers if n_gpu_layers < 0 else min(n_gpu_layers, total_layers)
+        logger.info(f"offloaded {offloaded}/{total_layers} layers to GPU")
+    logger.info(f"context size: {n_ctx} tokens")
+    _check_quantization(llm.metadata, vision_model_path, quantization, main_gpu)
+    if prompt_cache_bytes > 0:
+        # Llava15ChatHandler resets the context and evaluates the whole prompt itself,
+        # so this cache doesn't skip any prefill with it; it is off by default.
+        llm.set_cache(LlamaRAMCache(capacity_bytes=prompt_cache_bytes))
+    _loaded_llms.add(llm)
+    return llm
+
+def load_models(
+    vision_model_path: str,
+    clip_model_path: str,
+    batch_size: int = 4,
+    n_gpu_layers: Optional[int] = None,
+    tensor_split: Optional[List[float]] = None,
+    main_gpu: int = 0,
+    n_batch: int = 512,
+    n_ubatch: int = 512,
+    flash_attn: bool = False,
+    quantization: Optional[str] = None,
+    prompt_cache_bytes: int = 0,
     max_token: int = 2048
+) -> Llama:
+    """
+    Load (or get from the cache) the model get_image_descriptions_bytes uses for the same
+    arguments. See get_image_descriptions_bytes for the meaning of each argument.
+    The context is sized for the instructions plus `batch_size` full-size images, each
+    with the answer budget _token_budget gives a full-size image.
+    """
+    per_image = _image_tokens(None) + _token_budget((max_image_side, max_image_side), max_token)
+    return _get_llm(
+        vision_model_path,
+        clip_model_path,
+        n_gpu_layers,
+        n_ctx=max(4096, 1024 + prompt_overhead_tokens + per_image * max(1, batch_size)),
+        tensor_split=tuple(tensor_split) if tensor_split else None,
+        main_gpu=main_gpu,
+        n_batch=n_batch,
+        n_ubatch=n_ubatch,
+        flash_attn=flash_attn,
+        quantization=quantization,
+        prompt_cache_bytes=prompt_cache_bytes,
+    )
+
+# Options of get_image_descriptions_bytes that select the model load_models returns
+# (max_token too: it sizes the context).
+model_load_options = (
+    "n_gpu_layers", "tensor_split", "main_gpu", "n_batch", "n_ubatch",
+    "flash_attn", "quantization", "prompt_cache_bytes", "max_token",
+)
+
+def _split_model_kwargs(model_kwargs: Dict) -> Tuple[Dict, Dict]:
+    """
+    Split options meant for get_image_descriptions_bytes into those also taken by
+    load_models and the remaining ones.
+
+    Returns:
+        tuple: (load options, other options).
+    """
+    load_options = {k: v for k, v in model_kwargs.items() if k in model_load_options}
+    other_options = {k: v for k, v in model_kwargs.items() if k not in model_load_options}
+    return load_options, other_options
+
+@atexit.register
+def _close_llms():
+    """Free the models still held by the _get_llm cache."""
+    # cache_clear() drops the last strong references, so take the models first.
+    llms = list(_loaded_llms)
+    _get_llm.cache_clear()
+    for llm in llms:
+        try:
+            llm.close()
+        except Exception:
+            pass
+
+def _fit_batches(items: List[str], size: int, costs: Dict[str, int], budget: int) -> List[List[str]]:
+    """
+    Split a list into consecutive batches of at most `size` items whose total cost
+    (in tokens) stays within `budget`. An item too large for the budget gets a batch
+    of its own.
+    """
+    size = max(1, size)
+    batches = []
+    batch, total = [], 0
+    for item in items:
+        if batch and (len(batch) == size or total + costs[item] > budget):
+            batches.append(batch)
+            batch, total = [], 0
+        batch.append(item)
+        total += costs[item]
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _build_batch_prompt(filenames: List[str]) -> str:
+    """
+    Build the user message asking the model to answer once per image, each answer
+    enclosed in a <<FILE:name>> ... <<END>> block.
+    """
+    listing = "\n".join(f"{n + 1}. {name}" for n, name in enumerate(filenames))
+    return (
+        f"You are given {len(filenames)} images, attached in this order:\n{listing}\n\n"
+        "Describe every image separately following the instructions. "
+        "Start each description with a line <<FILE:name>> using the exact file name, "
+        "and finish it with a line <<END>>."
+    )
+
+_BATCH_BLOCK_RE = re.compile(r"<<FILE:\s*(.+?)\s*>>(.*?)<<END>>", re.DOTALL)
+
+def _parse_batch_response(content: str, filenames: List[str]) -> Dict[str, str]:
+    """
+    Parse a batched response back into a {filename: description} dictionary.
+    Blocks naming a file that was not part of the batch are ignored.
+    """
+    expected = set(filenames)
+    parsed = {}
+    for match in _BATCH_BLOCK_RE.finditer(content):
+        name, description = match.group(1), match.group(2).strip()
+        if name in expected and description:
+            parsed[name] = description
+    return parsed
+
+def _content_hash(data: bytes) -> str:
+    """Hash raw image bytes to find exact duplicates."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _group_duplicates(images: Dict[str, Tuple[str, bytes]], max_distance: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Group identical and near-identical images (logos, headers, watermarks repeated on
+    every page) so each group is described only once.
+    Exact duplicates are found by hashing the image bytes. When `imagehash` is installed
+    and `max_distance` is not None, images whose perceptual hashes differ by at most
+    `max_distance` bits are grouped too.
+
+    Returns:
+        Dict[str, List[str]]: Representative image name -> names of all images in its group
+                              (the representative included), in input order.
+    """
+    groups = {}
+    by_hash = {}
+    phashes = []  # (perceptual hash, representative name)
+    for name, (_, data) in images.items():
+        digest = _content_hash(data)
+        if digest in by_hash:
+            groups[by_hash[digest]].append(name)
+            continue
+        representative = name
+        if imagehash is not None and max_distance is not None:
+            try:
+                with Image.open(io.BytesIO(data)) as image:
+                    phash = imagehash.phash(image)
+                # Few distinct images per document, so a linear scan is enough.
+                match = next((rep for other, rep in phashes if phash - other <= max_distance), None)
+                if match is None:
+                    phashes.append((phash, name))
+                else:
+                    representative = match
+            except Exception as e:
+                logger.debug(f"Could not compute perceptual hash of {name}: {e}")
+        by_hash[digest] = representative
+        groups.setdefault(representative, []).append(name)
+    return groups
+
+def _image_data_url(ext: str, data: bytes) -> str:
+    """Return image bytes as a base64 `data:` URL."""
+    ext = ext.lower()
+    mime = "jpeg" if ext == "jpg" else ext
+    return f"data:image/{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+def _image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Return the (width, height) of encoded image bytes, or None if unreadable."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:  # only reads the header
+            return image.size
+    except Exception:
+        return None
+
+def _image_tokens(size: Optional[Tuple[int, int]], max_side: int = max_image_side) -> int:
+    """
+    Estimate how many context tokens an image takes: one token per image_patch_size
+    square patch plus one break token per row, after scaling to `max_side`.
+    Unknown sizes are counted as a full max_side x max_side image.
+    """
+    w, h = size or (max_side, max_side)
+    scale = min(1.0, max_side / max(w, h, 1))
+    cols = math.ceil(w * scale / image_patch_size)
+    rows = math.ceil(h * scale / image_patch_size)
+    return rows * (cols + 1)
+
+def _token_budget(size: Optional[Tuple[int, int]], max_token: int) -> int:
+    """
+    Scale the answer length with the image area: 256 + 64 * log2(width * height) tokens,
+    between 256 and `max_token`. Small images rarely need a long description.
+    """
+    if size is None:
+        return max_token
+    w, h = size
+    return int(min(max_token, max(256, 256 + math.log2(max(1, w * h)) * 64)))
+
+def _is_repeating(tokens: List[str], window: int = 64, n: int = 8, max_repeats: int = 3) -> bool:
+    """Tell whether an n-gram occurs `max_repeats` times in the last `window` tokens."""
+    recent = tokens[-window:]
+    if len(recent) < window:
+        return False
+    counts = collections.Counter(tuple(recent[i:i + n]) for i in range(len(recent) - n + 1))
+    return max(counts.values()) >= max_repeats
+
+# User message of single-image requests; the instructions are in the system message.
+single_image_request = "Describe this image following the instructions."
+
+def _describe(
+    llm: Llama,
+    instructions: str,
+    request: str,
+    image_urls: List[str],
+    max_token: int
+) -> str:
+    """
+    Run one chat completion over one or more images and return the raw answer.
+    The (long) instructions go in the system message, so every request starts with the
+    same tokens.
+    The answer is streamed so generation can be stopped as soon as the model starts
+    repeating itself, instead of filling the token budget with loops.
+    """
+    content = [{"type": "text", "text": request}]
+    for image_url in image_urls:
+        content.append({"type": "image_url", "image_url": {"url": image_url}})
+    started = time.perf_counter()
+    stream = llm.create_chat_completion(
+        messages=[
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": content},
+        ],
+        max_tokens=max_token,
+        repeat_penalty=1.15,
+        stream=True,
+    )
+    tokens = []
+    try:
+        for chunk in stream:
+            token = chunk['choices'][0]['delta'].get('content')
+            if not token:
+                continue
+            if not tokens:
+                logger.debug(f"Time to first token: {time.perf_counter() - started:.2f}s")
+            tokens.append(token)
+            if _is_repeating(tokens):
+                logger.debug("Repetition detected, stopping generation early.")
+                break
+    finally:
+        stream.close()
+    return "".join(tokens).strip()
+
+def get_image_descriptions_bytes(
+    vision_model_path: str,
+    clip_model_path: str,
+    images: Dict[str, Tuple[str, bytes]],
+    prompt: str = "Describe this image in detail.",
+    max_token: int = 2048,
+    batch_size: int = 4,
+    n_gpu_layers: Optional[int] = None,
+    tensor_split: Optional[List[float]] = None,
+    main_gpu: int = 0,
+    n_batch: int = 512,
+    n_ubatch: int = 512,
+    flash_attn: bool = False,
+    llm: Optional[Llama] = None,
+    near_duplicate_distance: Optional[int] = None,
+    quantization: Optional[str] = None,
+    prompt_cache_bytes: int = 0
 ) -> Dict[str, str]:
     """
-    Get descriptions for a list of images using a Pixtral model.
-    Models are loaded once, and each image is processed individually.
+    Get descriptions for in-memory images using a Pixtral model.
+    Models are loaded once per process and reused by later calls, and images are sent
+    to the model in batches of `batch_size` so the prompt prefill is shared by every
+    image of a batch.
 
     Args:
         vision_model_path (str): Path to the Pixtral model (GGUF file).
         clip_model_path (str): Path to the CLIP model (mmproj file).
-        image_paths (List[str]): A list of paths to the image files.
-        prompt (str): The prompt to use for each image.
-        max_token (int): Maximum number of tokens for each response.
+        images (Dict[str, Tuple[str, bytes]]): Image name -> (extension, encoded image bytes).
+        prompt (str): Instructions for describing the images, sent as the system message.
+        max_token (int): Maximum number of tokens for each image description. Smaller
+                         images get a smaller budget (see _token_budget).
+        batch_size (int): Number of images sent in a single request. Use 1 to
+                          process each image individually.
+        n_gpu_layers (Optional[int]): Number of layers to offload to the GPU, -1 for all.
+                                      If None, it is estimated from the free VRAM.
+        tensor_split (Optional[List[float]]): Proportion of the model to put on each GPU.
+        main_gpu (int): Index of the GPU used for small tensors and the VRAM probe.
+        n_batch (int): Logical batch size for prompt processing.
+        n_ubatch (int): Physical batch size for prompt processing.
+        flash_attn (bool): Use flash attention.
+        llm (Optional[Llama]): An already loaded model to use instead of loading one.
+                               The model loading options above are ignored when given.
+        near_duplicate_distance (Optional[int]): Maximum perceptual hash distance (in bits)
+                                                 for two images to share a description
+                                                 (requires imagehash). None (default) only
+                                                 skips exact duplicates: figures sharing a
+                                                 layout (same axes, chart templates) can be
+                                                 a few bits apart.
+        quantization (Optional[str]): Expected quantization of the vision model (e.g. "Q4_K_M").
+                                      A warning is logged if the model doesn't match.
+        prompt_cache_bytes (int): Size of a llama.cpp RAM prompt cache. 0 (default) disables
+                                  it; with Llava15ChatHandler it saves no prefill and only
+                                  copies the KV state after every request.
 
     Returns:
-        Dict[str, str]: A dictionary mapping each image's filename to its description.
+        Dict[str, str]: A dictionary mapping each image's name to its description.
     """
-    # 1. Load the models once at the beginning for efficiency.
-    print("Loading models... This may take a moment.")
-    try:
-        chat_handler = Llava15ChatHandler(clip_model_path=clip_model_path, verbose=False)
-        llm = Llama(
-            model_path=vision_model_path,
-            chat_handler=chat_handler,
-            n_ctx=4096,
-            n_gpu_layers=-1,  # Use -1 to offload all possible layers to GPU
-            verbose=False,
-        )
-        print("Models loaded successfully.")
-    except Exception as e:
-        print(f"Error loading models: {e}")
-        return {} # Return an empty dictionary if models fail to load
+    # 1. Load the models, or reuse the ones already loaded by a previous call.
+    if llm is None:
+        logger.info("Loading models... This may take a moment.")
+        try:
+            llm = load_models(
+                vision_model_path,
+                clip_model_path,
+                batch_size=batch_size,
+                n_gpu_layers=n_gpu_layers,
+                tensor_split=tensor_split,
+                main_gpu=main_gpu,
+                n_batch=n_batch,
+                n_ubatch=n_ubatch,
+                flash_attn=flash_attn,
+                quantization=quantization,
+                prompt_cache_bytes=prompt_cache_bytes,
+                max_token=max_token,
+            )
+            logger.info("Models loaded successfully.")
+        except Exception as e:
+            logger.error(f"Error loading models: {e}")
+            return {} # Return an empty dictionary if models fail to load
 
     # 2. Create a dictionary to store the results.
     descriptions_dict = {}
 
-    # 3. Loop through each image path provided in the list.
-    for image_path in image_paths:
-        filename = os.path.basename(image_path)
-        print(f"\nProcessing image: {filename}...")
+    # 3. Duplicated images are described once, through their group's representative.
+    duplicate_groups = _group_duplicates(images, near_duplicate_distance)
+    skipped = sum(len(members) - 1 for members in duplicate_groups.values())
+    if skipped:
+        logger.info(f"Skipping {skipped} duplicate image(s).")
+        for representative, members in duplicate_groups.items():
+            if len(members) > 1:
+                logger.info(f"Using the description of {representative} for {', '.join(members[1:])}.")
 
-        if not os.path.exists(image_path):
-            print(f"  -> Warning: File not found at '{image_path}'. Skipping.")
-            descriptions_dict[filename] = "Error: File not found."
-            continue
+    # 4. Send the images in batches; one prefill covers the whole batch.
+    # A batch must fit in the context: the instructions, then each image and its answer.
+    sizes = {name: _image_size(images[name][1]) for name in duplicate_groups}
+    token_budgets = {name: _token_budget(sizes[name], max_token) for name in duplicate_groups}
+    costs = {name: _image_tokens(sizes[name]) + token_budgets[name] for name in duplicate_groups}
+    context_budget = llm.n_ctx() - len(llm.tokenize(prompt.encode("utf-8"))) - prompt_overhead_tokens
+    for batch in _fit_batches(list(duplicate_groups), batch_size, costs, context_budget):
+        logger.info(f"Processing images: {', '.join(batch)}...")
+        image_urls = {name: _image_data_url(*images[name]) for name in batch}
 
-        try:
-            # 4. Create a separate chat completion for each image.
-            response = llm.create_chat_completion(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"file://{urllib.parse.quote(image_path)}"}}
-                        ],
-                    }
-                ],
-                max_tokens=max_token,
-            )
-            description = response['choices'][0]['message']['content'].strip()
-            
-            # 5. Save the description in the dictionary with the filename as the key.
-            descriptions_dict[filename] = description
-            print(f"  -> Description generated for {filename}.")
+        pending = batch
+        if len(batch) > 1:
+            try:
+                content = _describe(
+                    llm,
+                    prompt,
+                    _build_batch_prompt(batch),
+                    [image_urls[name] for name in batch],
+                    sum(token_budgets[name] for name in batch),
+                )
+                parsed = _parse_batch_response(content, batch)
+                descriptions_dict.update(parsed)
+                for name in parsed:
+                    logger.debug(f"Description generated for {name}.")
+                pending = [name for name in batch if name not in parsed]
+                if pending:
+                    logger.info(f"{len(pending)} image(s) missing from the batched answer, retrying one by one.")
+            except Exception as e:
+                logger.warning(f"Batched request failed ({e}), retrying one by one.")
 
-        except Exception as e:
-            print(f"  -> Error processing {filename}: {e}")
-            descriptions_dict[filename] = f"Error: Could not process image. Details: {e}"
+        # 5. Images the batch didn't cover (or single-image batches) are processed individually.
+        for name in pending:
+            try:
+                descriptions_dict[name] = _describe(
+                    llm, prompt, single_image_request, [image_urls[name]], token_budgets[name]
+                )
+                logger.debug(f"Description generated for {name}.")
+            except Exception as e:
+                logger.error(f"Error processing {name}: {e}")
+                descriptions_dict[name] = f"Error: Could not process image. Details: {e}"
+
+    for representative, members in duplicate_groups.items():
+        for name in members[1:]:
+            descriptions_dict[name] = descriptions_dict[representative]
 
     # 6. Return the dictionary containing all descriptions.
     return descriptions_dict
 
-def save_image(image_block, path:str, name:str):
+def get_image_descriptions(
+    vision_model_path: str,
+    clip_model_path: str,
+    image_paths: List[str],
+    prompt: str = "Describe this image in detail.",
+    max_token: int = 2048,
+    batch_size: int = 4,
+    **model_kwargs
+) -> Dict[str, str]:
+    """
+    Get descriptions for a list of image files using a Pixtral model.
+    Each file is read once and passed to get_image_descriptions_bytes.
+
+    Args:
+        vision_model_path (str): Path to the Pixtral model (GGUF file).
+        clip_model_path (str): Path to the CLIP model (mmproj file).
+        image_paths (List[str]): A list of paths to the image files.
+        prompt (str): Instructions for describing the images, sent as the system message.
+        max_token (int): Maximum number of tokens for each image description.
+        batch_size (int): Number of images sent in a single request.
+        **model_kwargs: Other options of get_image_descriptions_bytes (GPU offload,
+                        pre-loaded llm, duplicate detection, quantization).
+
+    Returns:
+        Dict[str, str]: A dictionary mapping each image's filename to its description.
+    """
+    images = {}
+    missing = {}
+    for image_path in image_paths:
+        filename = os.path.basename(image_path)
+        if not os.path.exists(image_path):
+            logger.warning(f"File not found at '{image_path}'. Skipping.")
+            missing[filename] = "Error: File not found."
+            continue
+        images[filename] = (pathlib.Path(image_path).suffix.lstrip("."), pathlib.Path(image_path).read_bytes())
+
+    descriptions_dict = get_image_descriptions_bytes(
+        vision_model_path=vision_model_path,
+        clip_model_path=clip_model_path,
+        images=images,
+        prompt=prompt,
+        max_token=max_token,
+        batch_size=batch_size,
+        **model_kwargs
+    )
+    descriptions_dict.update(missing)
+    return descriptions_dict
+
+# Image formats the vision model's image loader can decode as they are.
+raw_image_exts = {"png", "jpg", "jpeg", "bmp", "gif", "pnm", "pbm", "pgm", "ppm", "tga", "psd"}
+
+def prepare_image(image_block, max_side:Optional[int] = max_image_side) -> Tuple[str, bytes]:
+    '''
+    Returns an image block as (extension, encoded bytes) ready for the vision model.
+    The embedded bytes are kept as they are; the image is only decoded when it
+    must be converted (format the vision model can't read, CMYK) or shrunk.
+    Args:
+        image_block (dict): Image data with at least 'image' (bytes) and 'ext'.
+        max_side (Optional[int]): Images with a longer side are downscaled to fit in a
+                                  max_side x max_side square and encoded as JPEG.
+                                  None keeps the original resolution.
+    Returns:
+        Tuple[str, bytes]: The image extension and its encoded bytes.
+    '''
+    ext = image_block['ext'].lower()
+    too_large = max_side is not None and max(image_block.get('width', 0), image_block.get('height', 0)) > max_side
+    if not too_large and ext in raw_image_exts and image_block.get('colorspace') != 4:
+        return ext, image_block['image']
     image = Image.open(io.BytesIO(image_block['image']))
-    image.save(open(os.path.join(path,f"{name}.{image_block['ext']}"), "wb"), image_block['ext'])
-    print(f"{name}.{image_block['ext']} were save at {path}")
+    buffer = io.BytesIO()
+    if too_large:
+        # Larger images only add vision encoder tiles, not detail the model can use.
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        image.convert("RGB").save(buffer, "jpeg", quality=90)
+        return "jpg", buffer.getvalue()
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGB")
+    image.save(buffer, "png")
+    return "png", buffer.getvalue()
+
+def save_image(image_block, path, name:str, max_side:Optional[int] = max_image_side) -> str:
+    '''
+    Saves an image block to disk (see prepare_image) and returns the saved file name.
+    Args:
+        image_block (dict): Image data with at least 'image' (bytes) and 'ext'.
+        path (str | pathlib.Path): Directory to save the image in.
+        name (str): File name without extension.
+        max_side (Optional[int]): Maximum image side, passed to prepare_image.
+    Returns:
+        str: The name of the saved file, with its extension.
+    '''
+    path = pathlib.Path(path)
+    ext, data = prepare_image(image_block, max_side)
+    file_name = f"{name}.{ext}"
+    (path / file_name).write_bytes(data)
+    logger.debug(f"{file_name} saved at {path}")
+    return file_name
 
 def get_text(lines_object):
     '''
@@ -197,101 +807,368 @@ def get_text(lines_object):
     Returns:
         str: The extracted text as a single string.
     '''
-    text = ''
+    parts = []
     for l in lines_object:
         if 'spans' in l:
             for s in l['spans']:
-                text += s['text'] + " "
+                parts.append(s['text'])
+                parts.append(" ")
         else:
-            text += l['text']
-    return text.strip()
+            parts.append(l['text'])
+    return "".join(parts).strip()
 
-def page_to_text(page_blocks,page_number:int):
+def page_images(page, textpage) -> Dict[int, dict]:
     '''
-    Extracts text from a page's blocks.
+    Maps each image block number of a page to its image data.
+    Blocks are matched to the page's images by size and position, so no image is
+    decoded, and their bytes are read straight from the document by xref. Inline
+    images and images inside Form XObjects (which can't be located without
+    decoding them) go through the slower dict extraction.
     Args:
-        page_blocks (pymupdf.fitz.PageBlocks): The blocks of the page.
+        page (pymupdf.Page): The page to read the images from.
+        textpage (pymupdf.TextPage): Text page of `page` created with TEXT_PRESERVE_IMAGES;
+                                     its block numbers are the ones returned.
     Returns:
-        str: The extracted text from the page.
+        Dict[int, dict]: Block number -> dictionary with at least 'image' (bytes) and 'ext'.
     '''
-    text = ''
-    for block_n in range(len(page_blocks)):
-        if page_blocks[block_n]['type'] == 0:  # Text block
-            text += get_text(page_blocks[block_n]['lines'])
-            text += '\n'
-        elif page_blocks[block_n]['type'] == 1:  # Image block
-            save_image(
-                image_block=page_blocks[block_n], 
-                path=os.path.join(temp_images_dir), 
-                name=f"p{page_number}-b{page_blocks[block_n]['number']}"
-            )
-            text += f"[image: p{page_number}-b{page_blocks[block_n]['number']}.{page_blocks[block_n]['ext']}]\n"
-    return text
+    placements = [
+        (item[0], item[2], item[3], page.get_image_bbox(item))
+        for item in page.get_images(full=True)
+        if item[-1] == 0  # Drawn by the page itself, not by a Form XObject
+    ]
+    images = {}
+    inline_blocks = set()
+    for info in textpage.extractIMGINFO():
+        xref = next((
+            xref for xref, width, height, bbox in placements
+            if (width, height) == (info['width'], info['height'])
+            and max(abs(a - b) for a, b in zip(bbox, info['bbox'])) < 1
+        ), 0)
+        image = page.parent.extract_image(xref) if xref else None
+        if image:
+            images[info['number']] = image
+        else:
+            inline_blocks.add(info['number'])
+    if inline_blocks:
+        for block in page.get_text("dict", textpage=textpage)['blocks']:
+            if block['type'] == 1 and block['number'] in inline_blocks:
+                images[block['number']] = block
+    return images
+
+def is_decorative(
+    image_block,
+    min_pixels:int = min_image_pixels,
+    max_aspect:float = max_image_aspect,
+    min_entropy:Optional[float] = min_image_entropy
+) -> bool:
+    '''
+    Tells whether an image is too small, too thin or too uniform to be worth describing.
+    Args:
+        image_block (dict): Image data with 'width', 'height' and 'image' (bytes).
+        min_pixels (int): Minimum width * height of a described image.
+        max_aspect (float): Maximum ratio between the long and the short side.
+        min_entropy (Optional[float]): Minimum Shannon entropy (bits) of a 32x32 grayscale
+                                       thumbnail. None disables the check.
+    Returns:
+        bool: True if the image should be skipped.
+    '''
+    w, h = image_block.get('width', 0), image_block.get('height', 0)
+    if w * h < min_pixels or max(w, h) > max_aspect * max(1, min(w, h)):
+        return True
+    if min_entropy is not None:
+        try:
+            with Image.open(io.BytesIO(image_block['image'])) as image:
+                thumbnail = image.convert("L").resize((32, 32))
+            return thumbnail.entropy() < min_entropy
+        except Exception:
+            return False
+    return False
+
+def page_to_text(
+    page,
+    page_number:int,
+    images_dir:str = str(module_dir / temp_images_dir),
+    min_pixels:int = min_image_pixels,
+    max_aspect:float = max_image_aspect,
+    min_entropy:Optional[float] = min_image_entropy,
+    max_side:Optional[int] = max_image_side,
+    dump_images:bool = False
+) -> Tuple[str, Dict[str, Tuple[str, bytes]]]:
+    '''
+    Extracts text and images from a page, leaving a placeholder where each image was.
+    Decorative images (see is_decorative) are dropped and leave a short marker instead.
+    Args:
+        page (pymupdf.Page): The page to process.
+        page_number (int): The 1-based page number, used to name the images.
+        images_dir (str): Directory where the images are written when dump_images is set.
+        min_pixels, max_aspect, min_entropy: Thresholds passed to is_decorative.
+        max_side (Optional[int]): Maximum image side, passed to prepare_image.
+        dump_images (bool): Also write the images to images_dir (for debugging).
+    Returns:
+        Tuple[str, Dict[str, Tuple[str, bytes]]]: The extracted text and the page's images
+                                                  (name -> (extension, bytes)).
+    '''
+    extracted = {}
+    textpage = page.get_textpage(flags=pymupdf.TEXTFLAGS_DICT)  # same extraction as get_text("dict")
+    image_blocks = None
+    parts = []
+    for _, _, _, _, block_text, block_number, block_type in page.get_text("blocks", textpage=textpage):
+        if block_type == 0:  # Text block
+            parts.append(block_text.replace("\n", " ").strip())
+            parts.append("\n")
+        elif block_type == 1:  # Image block
+            if image_blocks is None:
+                image_blocks = page_images(page, textpage)
+            image_block = image_blocks.get(block_number)
+            if image_block is None:
+                continue
+            if is_decorative(image_block, min_pixels, max_aspect, min_entropy):
+                parts.append("[decorative image]\n")
+                continue
+            name = f"p{page_number}-b{block_number}"
+            ext, data = prepare_image(image_block, max_side)
+            extracted[name] = (ext, data)
+            if dump_images:  # debugging only, so converting the image twice doesn't matter
+                save_image(image_block, images_dir, name, max_side)
+            parts.append(image_placeholder(name))
+            parts.append("\n")
+    return "".join(parts), extracted
+
+def _extract_range(pdf_path:str, start:int, end:int, images_dir:str, **page_options) -> List[Tuple[int, str, Dict]]:
+    '''
+    Extracts the text and images of pages [start, end).
+    Runs in a worker process, so it opens its own copy of the document.
+    Returns:
+        List[Tuple[int, str, Dict]]: (page index, page text, page images) for each page of the range.
+    '''
+    with pymupdf.open(pdf_path) as doc:
+        return [(i, *page_to_text(doc[i], i + 1, images_dir, **page_options)) for i in range(start, end)]
+
+# Placeholder left in the text for each saved image, e.g. {{IMG:p1-b3}}
+image_placeholder_re = re.compile(r"\{\{IMG:([^}]+)\}\}")
+aho_corasick_min_placeholders = 100  # Fewer placeholders are replaced with the regex
+
+def image_placeholder(name:str) -> str:
+    '''Returns the placeholder left in the text for the image `name`.'''
+    return f"{{{{IMG:{name}}}}}"
+
+def _placeholder_replacer(descriptions:Dict[str, str]) -> Callable[[str], str]:
+    '''
+    Builds a function replacing every placeholder of a text in a single scan.
+    With many placeholders an Aho-Corasick automaton (pyahocorasick) is used; below
+    aho_corasick_min_placeholders, or without pyahocorasick, a regex is used since
+    building the automaton costs more than it saves.
+    '''
+    replacements = {name: f"[image: {description}]" for name, description in descriptions.items()}
+
+    def substitute(match):
+        # Images without a description (e.g. the model failed to load) keep a readable marker.
+        return replacements.get(match.group(1), f"[image: {match.group(1)}]")
+
+    if ahocorasick is None or len(replacements) < aho_corasick_min_placeholders:
+        return lambda text: image_placeholder_re.sub(substitute, text)
+
+    automaton = ahocorasick.Automaton()
+    for name, replacement in replacements.items():
+        placeholder = image_placeholder(name)
+        automaton.add_word(placeholder, (len(placeholder), replacement))
+    automaton.make_automaton()
+
+    def replace(text):
+        parts = []
+        last = 0
+        for end, (length, replacement) in automaton.iter(text):
+            start = end - length + 1
+            parts.append(text[last:start])
+            parts.append(replacement)
+            last = end + 1
+        parts.append(text[last:])
+        text = "".join(parts)
+        if "{{IMG:" in text:  # placeholders without a description
+            text = image_placeholder_re.sub(substitute, text)
+        return text
+    return replace
+
+def replace_placeholders(text:str, descriptions:Dict[str, str]) -> str:
+    '''
+    Replaces every image placeholder in a single pass over the text.
+    Args:
+        text (str): Text containing {{IMG:name}} placeholders.
+        descriptions (Dict[str, str]): Image name (without extension) -> description.
+    Returns:
+        str: The text with each placeholder replaced by "[image: description]", or by
+             "[image: name]" when the image has no description.
+    '''
+    return _placeholder_replacer(descriptions)(text)
 
 def insert_image_descriptions(
-    images_dir:str, 
-    pdf_text:str, 
+    images:Dict[str, Tuple[str, bytes]],
+    pdf_text:str,
     vision_model_path: str,
     clip_model_path: str,
-    prompt: str
+    prompt: str,
+    batch_size: int = 4,
+    **model_kwargs
     ):
-    images_file = os.listdir(images_dir)
-    images_path = [os.path.join(pathlib.Path(__file__).parent.resolve(),images_dir,i) for i in images_file]
-    print(images_path)
-    description_dict = get_image_descriptions(
-        vision_model_path=vision_model_path, 
-        clip_model_path=clip_model_path, 
-        image_paths=images_path, 
-        prompt=prompt
+    '''
+    Describes in-memory images and puts the descriptions in place of their placeholders.
+    Args:
+        images (Dict[str, Tuple[str, bytes]]): Image name -> (extension, bytes), as returned
+                                               by page_to_text.
+        pdf_text (str): Text containing {{IMG:name}} placeholders.
+    Returns:
+        str: The text with the image descriptions.
+    '''
+    descriptions = get_image_descriptions_bytes(
+        vision_model_path=vision_model_path,
+        clip_model_path=clip_model_path,
+        images=images,
+        prompt=prompt,
+        batch_size=batch_size,
+        **model_kwargs
     )
-    for file_name in description_dict:
-        pdf_text = pdf_text.replace(file_name,description_dict[file_name])
-    
-    return pdf_text
+    return replace_placeholders(pdf_text, descriptions)
 
 def save_text(text:str, txt_name):
     with open(txt_name,"w+") as f:
         f.write(text)
 
+def _write_pages(raw_file, page_ranges, images:Dict[str, Tuple[str, bytes]]):
+    '''
+    Writes extracted pages to a file as their ranges complete, in page order,
+    and collects their images into `images`.
+    '''
+    for pages in page_ranges:
+        for _, page_text, extracted in pages:
+            raw_file.write(page_text)
+            raw_file.write("\n\n")
+            images.update(extracted)
+
+def _stream_replace_placeholders(src:str, dst:str, descriptions:Dict[str, str]):
+    '''Copies src to dst line by line, replacing image placeholders on the way.'''
+    replace = _placeholder_replacer(descriptions)
+    with open(src) as raw_file, open(dst, "w") as out_file:
+        for line in raw_file:
+            out_file.write(replace(line))
+
     
 def pdf_to_text(
         pdf_path:str,
         vision_model_path: str,
         clip_model_path: str,
-        prompt: str
+        prompt: str,
+        batch_size: int = 4,
+        workers: Optional[int] = None,
+        page_options: Optional[Dict] = None,
+        dump_images: bool = False,
+        images_dir: Optional[str] = None,
+        **model_kwargs
     ):
-    doc = pymupdf.open(pdf_path) # open a document
-    # Choose a page (e.g., first page is index 0)
-    pages_num = len(doc)
+    page_options = dict(page_options or {}, dump_images=dump_images)
+    load_options, other_options = _split_model_kwargs(model_kwargs)
+
+    # Load the models in the background while the text and images are extracted.
+    warm_up = {}
+    def load_in_background():
+        try:
+            warm_up['llm'] = load_models(vision_model_path, clip_model_path, batch_size=batch_size, **load_options)
+        except Exception as e:
+            logger.warning(f"Loading models in the background failed: {e}")
+    loader = None
+    if other_options.get('llm') is None:
+        loader = threading.Thread(target=load_in_background, name="model-loader", daemon=True)
+        loader.start()
+
+    with pymupdf.open(pdf_path) as doc: # open a document
+        pages_num = len(doc)
     logger.info(f"Document has {pages_num} pages.")
     
-    os.makedirs(os.path.join(pathlib.Path(__file__).parent.resolve(),temp_images_dir), exist_ok=True)
-    raw_text = ""
-    for i in range(pages_num):
-        page = doc[i]
-        page_dict = page.get_text("dict")
-        raw_text += page_to_text(page_dict['blocks'],i+1)
-        raw_text += "\n\n"
-
-    process_text = insert_image_descriptions(
-        images_dir=temp_images_dir,
-        pdf_text=raw_text,
-        vision_model_path=vision_model_path,
-        clip_model_path=clip_model_path,
-        prompt=prompt
-    )
+    images_dir = str(module_dir / (images_dir or temp_images_dir))
+    if dump_images:
+        os.makedirs(images_dir, exist_ok=True)
     txt_file_name = "".join(os.path.basename(pdf_path).split(".")[:-1])
-    save_text(process_text,os.path.join(os.path.join(pathlib.Path(__file__).parent.resolve(),f"{txt_file_name}.txt")))
+    txt_path = module_dir / f"{txt_file_name}.txt"
+    raw_path = f"{txt_path}.raw"
 
-if __name__ == '__main__':
+    # Pages are independent: split them into contiguous ranges, one per worker process.
+    # Small documents aren't worth the cost of starting the workers.
+    workers = max(1, min(workers or os.cpu_count() or 1, math.ceil(pages_num / min_pages_per_worker)))
+    bounds = [pages_num * n // workers for n in range(workers + 1)]
+    ranges = [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+    try:
+        # First pass: stream the text, with image placeholders, to disk as pages are extracted.
+        # The images stay in memory until they are described.
+        images = {}
+        with open(raw_path, "w") as raw_file:
+            if workers == 1:
+                _write_pages(raw_file, (_extract_range(pdf_path, start, end, images_dir, **page_options) for start, end in ranges), images)
+            else:
+                logger.info(f"Extracting pages with {workers} worker processes.")
+                # Spawn rather than fork: the model loader thread may be running in this process.
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+                ) as executor:
+                    futures = [executor.submit(_extract_range, pdf_path, start, end, images_dir, **page_options) for start, end in ranges]
+                    _write_pages(raw_file, (future.result() for future in futures), images)
+
+        if loader is not None:
+            loader.join()
+            if 'llm' in warm_up:
+                other_options['llm'] = warm_up['llm']
+
+        descriptions = get_image_descriptions_bytes(
+            vision_model_path=vision_model_path,
+            clip_model_path=clip_model_path,
+            images=images,
+            prompt=prompt,
+            batch_size=batch_size,
+            **load_options,
+            **other_options
+        )
+
+        # Second pass: stream the raw text into the final file, replacing the placeholders.
+        _stream_replace_placeholders(raw_path, txt_path, descriptions)
+    finally:
+        # The raw text is only an intermediate file; don't leave it behind on errors.
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+def _parse_args(argv:Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Advanced PDF to Text Converter with AI-Powered Image Description")
-    parser.add_argument("pdf_path", type=str, help="Path to the PDF file")
-    parser.add_argument("--vision_model_path", type=str, default=model_path, help="Path to the Vision model (GGUF file)")
-    parser.add_argument("--clip_model_path", type=str, default=clip_model_path, help="Path to the CLIP model (GGUF file)")
+    parser.add_argument("pdf_path", type=str, nargs="?", default=None, help="Path to the PDF file")
+    parser.add_argument("--pdf", type=str, default=pdf_path, help="Path to the PDF file (instead of the positional argument)")
+    parser.add_argument("--vision-model", "--vision_model_path", dest="vision_model_path", type=str, default=model_path, help="Path to the Vision model (GGUF file)")
+    parser.add_argument("--clip-model", "--clip_model_path", dest="clip_model_path", type=str, default=clip_model_path, help="Path to the CLIP model (GGUF file)")
     parser.add_argument("--prompt", type=str, default=image_describing_prompt, help="Prompt to use for each image")
-    args = parser.parse_args()
+    parser.add_argument("--temp-images-dir", type=str, default=temp_images_dir, help="Directory where images are saved with --dump-images")
+    parser.add_argument("--dump-images", action="store_true", help="Also save the extracted images to disk (for debugging)")
+    parser.add_argument("--batch-size", type=int, default=4, help="Number of images sent to the model in a single request")
+    parser.add_argument("--n-gpu-layers", type=int, default=None, help="Layers to offload to the GPU, -1 for all (default: estimated from free VRAM)")
+    parser.add_argument("--max-tokens", type=int, default=2048, help="Maximum number of tokens for each image description")
+    args = parser.parse_args(argv)
 
-    if args.pdf_path == "" or args.vision_model_path == "" or args.prompt == "":
-        raise Exception(f"Variable(s) isn't (aren't) set(s) Please review the variable in the {__file__}")
+    args.pdf_path = args.pdf_path or args.pdf
+    missing = [name for name, value in (
+        ("pdf", args.pdf_path),
+        ("--vision-model", args.vision_model_path),
+        ("--clip-model", args.clip_model_path),
+        ("--prompt", args.prompt),
+    ) if not value]
+    if missing:
+        parser.error(f"missing required value(s): {', '.join(missing)}")
+    return args
 
-    pdf_to_text(pdf_path=args.pdf_path, vision_model_path=args.vision_model_path, clip_model_path=args.clip_model_path,prompt= args.prompt)
+if __name__ == '__main__':
+    args = _parse_args()
+    pdf_to_text(
+        pdf_path=args.pdf_path,
+        vision_model_path=args.vision_model_path,
+        clip_model_path=args.clip_model_path,
+        prompt=args.prompt,
+        batch_size=args.batch_size,
+        dump_images=args.dump_images,
+        images_dir=args.temp_images_dir,
+        n_gpu_layers=args.n_gpu_layers,
+        max_token=args.max_tokens,
+    )